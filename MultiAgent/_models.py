@@ -0,0 +1,185 @@
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+import torch
+import torch._dynamo
+from transformers import AutoTokenizer, pipeline
+from sentence_transformers import SentenceTransformer
+
+try:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTModelForSeq2SeqLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+except ImportError:
+    ORTQuantizer = None
+
+try:
+    from piper.voice import PiperVoice
+except ImportError:
+    PiperVoice = None
+
+try:
+    from optimum.bettertransformer import BetterTransformer
+except ImportError:
+    BetterTransformer = None
+
+# Let any graph torch.compile can't capture run eagerly instead of raising
+torch._dynamo.config.suppress_errors = True
+
+# Use every core for intra-op GEMMs (containers often default to a single thread),
+# or this process's share of them when several workers run (see gunicorn.conf.py)
+torch.set_num_threads(int(os.getenv("TORCH_NUM_THREADS", os.cpu_count() or 1)))
+try:
+    torch.set_num_interop_threads(2)
+except RuntimeError:
+    # Already fixed once any inter-op work has started (e.g. on module reload)
+    pass
+
+CUDA_AVAILABLE = torch.cuda.is_available()
+PIPELINE_KWARGS = {"device": 0, "torch_dtype": torch.float16} if CUDA_AVAILABLE else {}
+
+ONNX_DIR = Path(".onnx_models")
+EMBEDDER_ID = "sentence-transformers/all-MiniLM-L6-v2"
+SUMMARIZER_ID = "t5-small"
+PIPER_VOICE_PATH = os.getenv("PIPER_VOICE", "en_US-lessac-medium.onnx")
+
+
+def _use_onnx() -> bool:
+    """ONNX Runtime INT8 only pays off on CPU; GPUs keep the PyTorch models."""
+    return ORTQuantizer is not None and not CUDA_AVAILABLE
+
+def cache_tag(model_id: str) -> str:
+    """Model id plus the backend serving it, for keys of persisted model outputs.
+
+    INT8 ONNX, FP16 CUDA and FP32 PyTorch give slightly different outputs, so their
+    results must not be mixed in one cache.
+    """
+    backend = "onnx-int8" if _use_onnx() else "torch-fp16" if CUDA_AVAILABLE else "torch-fp32"
+    return f"{model_id}:{backend}"
+
+def _export_quantized(model_cls, model_id: str, onnx_files, **export_kwargs) -> Path:
+    """Export a model to ONNX and dynamically quantize it to INT8, once per machine."""
+    target = ONNX_DIR / model_id.replace("/", "__")
+    quantized = [f"{Path(name).stem}_quantized.onnx" for name in onnx_files]
+    if all((target / name).exists() for name in quantized):
+        return target
+
+    # Build in a private directory and rename it into place, so workers exporting at
+    # the same time never write into, or load from, a half-finished target
+    ONNX_DIR.mkdir(exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=ONNX_DIR))
+    try:
+        model_cls.from_pretrained(model_id, export=True, **export_kwargs).save_pretrained(staging)
+        AutoTokenizer.from_pretrained(model_id).save_pretrained(staging)
+        qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        for name in onnx_files:
+            quantizer = ORTQuantizer.from_pretrained(staging, file_name=name)
+            quantizer.quantize(save_dir=staging, quantization_config=qconfig)
+        try:
+            os.replace(staging, target)
+        except OSError:
+            # Another worker renamed its finished export into place first
+            if not all((target / name).exists() for name in quantized):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def _optimize(model):
+    """Swap in fused attention kernels and, on GPU, compile the forward pass."""
+    if BetterTransformer is not None:
+        try:
+            model = BetterTransformer.transform(model)
+        except (NotImplementedError, ValueError):
+            # Architecture not supported by this optimum version; keep eager attention
+            pass
+    if CUDA_AVAILABLE:
+        model.forward = torch.compile(model.forward, mode="reduce-overhead", fullgraph=False)
+    return model
+
+
+class OnnxSentenceEmbedder:
+    """Minimal SentenceTransformer stand-in backed by a quantized ONNX graph.
+
+    Reproduces all-MiniLM-L6-v2's mean pooling and L2 normalisation so scores
+    match the PyTorch model.
+    """
+
+    def __init__(self, model_dir: Path, max_seq_length: int = 256):
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir, file_name="model_quantized.onnx", provider="CPUExecutionProvider"
+        )
+        self.max_seq_length = max_seq_length
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True,
+               show_progress_bar: bool = False, normalize_embeddings: bool = True):
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            inputs = self.tokenizer(
+                sentences[start:start + batch_size], padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors="pt"
+            )
+            hidden = self.model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+            batches.append(torch.nn.functional.normalize(pooled, p=2, dim=1).numpy())
+
+        embeddings = np.concatenate(batches) if batches else np.empty((0, 0), np.float32)
+        return embeddings[0] if single else embeddings
+
+
+@lru_cache(maxsize=None)
+def get_summarizer():
+    """Load the T5 summarization pipeline once per process."""
+    if _use_onnx():
+        model_dir = _export_quantized(
+            ORTModelForSeq2SeqLM, SUMMARIZER_ID,
+            ["encoder_model.onnx", "decoder_model.onnx", "decoder_with_past_model.onnx"],
+            use_merged=False,
+        )
+        model = ORTModelForSeq2SeqLM.from_pretrained(
+            model_dir,
+            encoder_file_name="encoder_model_quantized.onnx",
+            decoder_file_name="decoder_model_quantized.onnx",
+            decoder_with_past_file_name="decoder_with_past_model_quantized.onnx",
+        )
+        return pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(model_dir))
+    summarizer = pipeline("summarization", model=SUMMARIZER_ID, **PIPELINE_KWARGS)
+    summarizer.model = _optimize(summarizer.model)
+    return summarizer
+
+@lru_cache(maxsize=None)
+def get_synthesizer():
+    """Load the Flan-T5 text2text pipeline once per process."""
+    synthesizer = pipeline("text2text-generation", model="google/flan-t5-large", **PIPELINE_KWARGS)
+    synthesizer.model = _optimize(synthesizer.model)
+    return synthesizer
+
+@lru_cache(maxsize=None)
+def get_embedder():
+    """Load the MiniLM sentence embedder once per process."""
+    if _use_onnx():
+        return OnnxSentenceEmbedder(
+            _export_quantized(ORTModelForFeatureExtraction, EMBEDDER_ID, ["model.onnx"])
+        )
+    if CUDA_AVAILABLE:
+        embedder = SentenceTransformer(EMBEDDER_ID, device="cuda").half()
+    else:
+        embedder = SentenceTransformer(EMBEDDER_ID)
+    embedder[0].auto_model = _optimize(embedder[0].auto_model)
+    return embedder
+
+@lru_cache(maxsize=None)
+def get_voice():
+    """Load the local Piper voice once per process, or None to fall back to gTTS."""
+    if PiperVoice is None or not os.path.exists(PIPER_VOICE_PATH):
+        return None
+    return PiperVoice.load(PIPER_VOICE_PATH)
@@ -0,0 +1,14 @@
+from typing import List
+import pypdfium2 as pdfium
+
+# Kept free of torch/crewai imports: PDF pool workers unpickle this function by
+# reference, so whatever this module imports is loaded in every worker process
+
+
+def pdfium_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) from a PDF on disk."""
+    pdf = pdfium.PdfDocument(path)
+    try:
+        return [pdf[i].get_textpage().get_text_range() for i in range(start, stop)]
+    finally:
+        pdf.close()
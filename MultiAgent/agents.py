@@ -1,13 +1,12 @@
 from crewai import Agent
 from textwrap import dedent
-from transformers import pipeline
-import torch
-from sentence_transformers import SentenceTransformer
 
 # Import tools as actual instances from your tools module
 from MultiAgent.tools import (
     arxiv_search,
     semantic_scholar_search,
+    parallel_paper_search,
+    streaming_paper_pipeline,
     doi_resolver,
     pdf_text_extractor,
     url_processor,
@@ -19,12 +18,6 @@ from MultiAgent.tools import (
 )
 
 class CustomAgents:
-    def __init__(self):
-        # Initialize models
-        self.Summarizer = pipeline("summarization", model="google-t5/t5-small", torch_dtype=torch.float16)
-        self.TextGeneration = pipeline("text-generation", model="openai-community/gpt2-medium", torch_dtype=torch.float16)
-        self.TopicClassifier = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-
     def research_agent(self):
         return Agent(
             role="Research Paper Collector",
@@ -36,7 +29,7 @@ class CustomAgents:
                 Search for and collect research papers based on user queries, 
                 including metadata like title, authors, abstract, and publication year.
             """),
-            tools=[arxiv_search, semantic_scholar_search, doi_resolver],
+            tools=[parallel_paper_search, streaming_paper_pipeline, arxiv_search, semantic_scholar_search, doi_resolver],
             allow_delegation=False,
             verbose=True
         )
@@ -13,11 +13,16 @@ audio_agent = agents.audio_agent()
 search_task = Task(
     description="""
     Search for research papers based on the given query:
-    1. Use arxiv_search and semantic_scholar_search to find relevant papers
+    1. Use parallel_paper_search to query arXiv and Semantic Scholar and resolve any
+       provided DOIs concurrently in a single call
     2. Apply filtering options (relevance, recency) as specified in the inputs
     3. For each paper, collect title, authors, abstract, publication year, and URL
-    4. If DOI references are provided, resolve them using doi_resolver
-    5. Return a complete list with at least 5 relevant papers with metadata
+    4. Fall back to arxiv_search, semantic_scholar_search or doi_resolver only to retry
+       a source listed under "errors" in the parallel_paper_search result
+    5. When the topic list is already known, prefer streaming_paper_pipeline: it
+       performs the search, full-text extraction and topic classification in a single
+       streamed call, and its output can be passed straight on to the later tasks
+    6. Return a complete list with at least 5 relevant papers with metadata
     
     Papers should be returned as a structured list with consistent metadata fields.
     """,
@@ -62,9 +67,11 @@ process_task = Task(
 classification_task = Task(
     description="""
     Classify all processed papers according to the provided topic list:
-    1. Use the topic_classifier tool to analyze each paper's content
-    2. Calculate relevance scores for each topic (scale 0.0-1.0)
-    3. Assign primary topic (highest score) and secondary topics (score > 0.5)
+    1. Use the topic_classifier tool to analyze the content of all papers in a single call,
+       passing every paper's text as one list
+    2. The tool returns relevance scores for each topic (scale 0.0-1.0) along with the
+       primary topic (highest score) and secondary topics (score > 0.5) of every paper
+    3. Keep the primary and secondary topic assignments returned by the tool
     4. Group papers by primary topic
     5. Return a comprehensive classification with papers organized by topic and relevance scores
     
@@ -80,7 +87,8 @@ classification_task = Task(
 summary_task = Task(
     description="""
     Create comprehensive summaries for each processed paper:
-    1. Use text_summarizer to generate concise yet complete summaries
+    1. Collect the text of every paper first, then call text_summarizer once with the
+       whole list to generate concise yet complete summaries
     2. For each summary, include:
        - Main research question/objective
        - Key methodology components
@@ -102,7 +110,8 @@ synthesis_task = Task(
     Generate cross-paper syntheses for each identified topic:
     1. For each topic from the classification results:
        a. Gather all papers primarily classified under that topic
-       b. Use cross_paper_synthesizer to analyze relationship between papers
+       b. Call cross_paper_synthesizer once with a mapping of every topic to its papers
+          to analyze relationships between papers
        c. Create a synthesis that:
           - Identifies common themes and consistent findings across papers
           - Highlights differences in methodologies and conflicting results
@@ -125,15 +134,16 @@ audio_task = Task(
     Convert all paper summaries and topic syntheses to audio format:
     1. For each paper summary:
        a. Format text for better audio consumption (spell out abbreviations, etc.)
-       b. Generate an audio file using audio_generator
-       c. Create a properly named audio file with paper title and authors
+       b. Identify it by paper title and authors
     
     2. For each topic synthesis:
        a. Format text for better spoken flow
-       b. Generate an audio file using audio_generator
-       c. Create a properly named audio file with topic name
+       b. Identify it by topic name
     
-    3. Return a structured list of audio files with:
+    3. Call audio_generator once with the full list of {id, text} records for every
+       summary and synthesis so the audio files are generated concurrently
+    
+    4. Return a structured list of audio files with:
        - File path
        - Type (summary or synthesis)
        - Associated paper title or topic
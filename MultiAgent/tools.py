@@ -1,146 +1,329 @@
 from crewai.tools import tool
 import os
-import requests
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
 import PyPDF2
-import arxiv
-from semanticscholar import SemanticScholar
-import crossref_commons.retrieval
-from gtts import gTTS
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import pypdfium2 as pdfium
+import asyncio
+import functools
+import io
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+import hashlib
+import multiprocessing
+import pickle
 import tempfile
-from typing import List, Dict, Union
-import uuid
-from transformers import pipeline
+import wave
+import httpx
+import feedparser
+from diskcache import Cache, ENOVAL
+from gtts import gTTS
+import numpy as np
+import torch
+from typing import Callable, List, Dict, Optional, Tuple, Union
 from pathlib import Path 
+from urllib.parse import quote, urlsplit
+from MultiAgent._pdf import pdfium_page_range
+from MultiAgent._models import (EMBEDDER_ID, SUMMARIZER_ID, cache_tag, get_summarizer,
+                                get_synthesizer, get_embedder, get_voice)
+
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+S2_SEARCH_URL = "https://api.semanticscholar.org/graph/v1/paper/search"
+CROSSREF_WORKS_URL = "https://api.crossref.org/works/"
+ARXIV_SORT_CRITERIA = ("relevance", "lastUpdatedDate", "submittedDate")
+CACHE_TTL = 24 * 60 * 60
+PDF_PARALLEL_MIN_PAGES = 32
+PDF_MAX_WORKERS = 8
+SECONDARY_TOPIC_THRESHOLD = 0.5
+SUMMARY_CHUNK_TOKENS = 480
+SUMMARY_CHUNK_OVERLAP = 32
+CHUNK_SUMMARY_MAX_LENGTH = 150
+CHUNK_SUMMARY_MIN_LENGTH = 30
+AUDIO_DIR = "audio_files"
+AUDIO_MAX_WORKERS = 16
+PIPELINE_FETCH_CONCURRENCY = 8
+PIPELINE_EMBED_BATCH = 8
+PIPELINE_FLUSH_SECONDS = 0.2
+
+_cache = Cache(".tool_cache")
+
+def cached(ttl: Optional[int] = CACHE_TTL, key: Optional[Callable] = None,
+           cache_if: Optional[Callable] = None):
+    """Persist a function's results in the on-disk tool cache.
+
+    Entries are keyed on the function name plus a hash of its arguments, or of
+    ``key(*args, **kwargs)`` when given, and expire after ``ttl`` seconds.
+    Results for which ``cache_if(result)`` is false are returned but not stored.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            parts = key(*args, **kwargs) if key else (args, sorted(kwargs.items()))
+            cache_key = f"{func.__name__}:{hashlib.sha256(pickle.dumps(parts)).hexdigest()}"
+            result = _cache.get(cache_key, default=ENOVAL)
+            if result is ENOVAL:
+                result = func(*args, **kwargs)
+                if cache_if is None or cache_if(result):
+                    _cache.set(cache_key, result, expire=ttl)
+            return result
+        return wrapper
+    return decorator
+
+def _file_fingerprint(file_path: str):
+    return (os.path.abspath(file_path), os.path.getmtime(file_path), os.path.getsize(file_path))
+
+PDF_POOL_WORKERS = min(PDF_MAX_WORKERS, os.cpu_count() or 1)
+
+# PDFium is not thread-safe, so large documents are split across one long-lived
+# process pool. Workers come from a forkserver rather than forking this process,
+# which already runs torch/OpenMP and HTTP threads
+_pdf_pool = ProcessPoolExecutor(
+    max_workers=PDF_POOL_WORKERS,
+    mp_context=multiprocessing.get_context(
+        'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    ),
+)
+
+def _read_pdf_text(source: Union[str, bytes]) -> str:
+    """Extract text from a PDF path or in-memory bytes.
+
+    Uses PDFium, falling back to PyPDF2 if PDFium can't open the document.
+    """
+    try:
+        pdf = pdfium.PdfDocument(source)
+    except pdfium.PdfiumError:
+        stream = io.BytesIO(source) if isinstance(source, bytes) else open(source, 'rb')
+        with stream:
+            reader = PyPDF2.PdfReader(stream)
+            return '\n'.join([page.extract_text() for page in reader.pages])
+
+    n_pages = len(pdf)
+    # In-memory PDFs are extracted here rather than pickled to every pool worker
+    if n_pages < PDF_PARALLEL_MIN_PAGES or isinstance(source, bytes):
+        try:
+            return '\n'.join(pdf[i].get_textpage().get_text_range() for i in range(n_pages))
+        finally:
+            pdf.close()
+    pdf.close()
+
+    # Each worker opens its own handle on a contiguous page range
+    step = -(-n_pages // PDF_POOL_WORKERS)
+    starts = range(0, n_pages, step)
+    chunks = _pdf_pool.map(pdfium_page_range, repeat(source, len(starts)), starts,
+                           [min(start + step, n_pages) for start in starts])
+    return '\n'.join(text for chunk in chunks for text in chunk)
+
+@cached(ttl=None, key=_file_fingerprint)
+def _extract_pdf_text(file_path: str) -> str:
+    return _read_pdf_text(file_path)
 
 @tool("pdf_text_extractor")
 def pdf_text_extractor(file_path: str) -> str:
     """Extracts text from PDF files."""
     try:
-        with open(file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            return '\n'.join([page.extract_text() for page in reader.pages])
+        return _extract_pdf_text(file_path)
     except Exception as e:
         raise RuntimeError(f"Error extracting PDF text: {e}")
 
-@tool("arxiv_search")
-def arxiv_search(query: str, max_results: int = 5, sort_by: str = "relevance") -> List[Dict]:
-    """Search Arxiv for research papers."""
-    sort_criteria = {
-        "relevance": arxiv.SortCriterion.Relevance,
-        "lastUpdatedDate": arxiv.SortCriterion.LastUpdatedDate,
-        "submittedDate": arxiv.SortCriterion.SubmittedDate,
-    }
-    sort_criterion = sort_criteria.get(sort_by, arxiv.SortCriterion.Relevance)
-    
-    search = arxiv.Search(query=query, max_results=max_results, sort_by=sort_criterion)
+HTTP_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+
+# Shared keep-alive pool so repeated fetches skip the TCP/TLS handshake
+_http = httpx.Client(http2=True, headers=HTTP_HEADERS, limits=HTTP_LIMITS,
+                     timeout=30.0, follow_redirects=True)
+
+def _async_client() -> httpx.AsyncClient:
+    # Async clients are bound to the event loop, so each asyncio.run gets its own
+    return httpx.AsyncClient(
+        http2=True,
+        headers=HTTP_HEADERS,
+        timeout=30.0,
+        follow_redirects=True,
+        transport=httpx.AsyncHTTPTransport(http2=True, retries=2, limits=HTTP_LIMITS),
+    )
+
+async def _arxiv_async(client: httpx.AsyncClient, query: str, max_results: int = 5,
+                       sort_by: str = "relevance") -> List[Dict]:
+    response = await client.get(ARXIV_API_URL, params={
+        "search_query": f"all:{query}",
+        "max_results": max_results,
+        "sortBy": sort_by if sort_by in ARXIV_SORT_CRITERIA else "relevance",
+        "sortOrder": "descending",
+    })
+    response.raise_for_status()
     return [
         {
-            "title": result.title,
-            "authors": [author.name for author in result.authors],
-            "summary": result.summary,
-            "published": str(result.published),
-            "url": result.pdf_url,
-            "doi": getattr(result, 'doi', None),
+            "title": " ".join(entry.title.split()),
+            "authors": [author.name for author in entry.get('authors', [])],
+            "summary": entry.summary.strip(),
+            "published": entry.published,
+            "url": next((link.href for link in entry.links if link.get('type') == 'application/pdf'),
+                        entry.link),
+            "doi": entry.get('arxiv_doi'),
             "source": "arXiv",
         }
-        for result in search.results()
+        for entry in feedparser.parse(response.text).entries
+    ]
+
+async def _s2_async(client: httpx.AsyncClient, query: str, max_results: int = 5) -> List[Dict]:
+    response = await client.get(S2_SEARCH_URL, params={
+        "query": query,
+        "limit": max_results,
+        "fields": "title,authors,abstract,year,url,externalIds",
+    })
+    response.raise_for_status()
+    return [
+        {
+            "title": result.get('title'),
+            "authors": [author.get('name') for author in result.get('authors') or []],
+            "abstract": result.get('abstract'),
+            "year": result.get('year'),
+            "url": result.get('url'),
+            "doi": (result.get('externalIds') or {}).get("DOI", ""),
+            "source": "Semantic Scholar",
+        }
+        for result in response.json().get('data', [])
     ]
 
+async def _doi_async(client: httpx.AsyncClient, doi: str) -> Dict[str, Union[str, List]]:
+    doi = doi.strip().removeprefix('doi:').removeprefix('https://doi.org/')
+    # DOIs may contain '<', '>', ';', '#' or '?' (e.g. SICI-style), which must be escaped
+    response = await client.get(CROSSREF_WORKS_URL + quote(doi, safe='/'))
+    response.raise_for_status()
+    work = response.json()['message']
+
+    return {
+        "doi": doi,
+        "title": (work.get('title') or ['Unknown Title'])[0],
+        "authors": [' '.join(filter(None, [a.get('given'), a.get('family')])) 
+                   for a in work.get('author', [])],
+        "abstract": work.get('abstract', ''),
+        "year": work.get('published', {}).get('date-parts', [[None]])[0][0] or '',
+        "journal": (work.get('container-title') or [''])[0],
+        "publisher": work.get('publisher', ''),
+        "url": f"https://doi.org/{doi}",
+        "source": "DOI",
+    }
+
+async def _run_with_client(fetcher, *args):
+    async with _async_client() as client:
+        return await fetcher(client, *args)
+
+async def _fetch_all(query: str, dois: List[str], max_results: int = 5,
+                     sort_by: str = "relevance") -> Dict[str, Union[List[Dict], Dict[str, str]]]:
+    """Query every source concurrently; a failing source is reported, not fatal."""
+    async with _async_client() as client:
+        arxiv_papers, s2_papers, *doi_papers = await asyncio.gather(
+            _arxiv_async(client, query, max_results, sort_by),
+            _s2_async(client, query, max_results),
+            *[_doi_async(client, doi) for doi in dois],
+            return_exceptions=True,
+        )
+
+    results = {"arxiv": [], "semantic_scholar": [], "dois": [], "errors": {}}
+    outcomes = [("arxiv", arxiv_papers), ("semantic_scholar", s2_papers)]
+    outcomes += [(f"doi:{doi}", paper) for doi, paper in zip(dois, doi_papers)]
+    for source, outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            results["errors"][source] = f"{type(outcome).__name__}: {outcome}"
+        elif source.startswith("doi:"):
+            results["dois"].append(outcome)
+        else:
+            results[source] = outcome
+    return results
+
+@tool("arxiv_search")
+@cached()
+def arxiv_search(query: str, max_results: int = 5, sort_by: str = "relevance") -> List[Dict]:
+    """Search Arxiv for research papers."""
+    try:
+        return asyncio.run(_run_with_client(_arxiv_async, query, max_results, sort_by))
+    except Exception as e:
+        raise RuntimeError(f"Error searching arXiv: {e}")
+
 @tool("semantic_scholar_search")
+@cached()
 def semantic_scholar_search(query: str, max_results: int = 5) -> List[Dict]:
     """Search Semantic Scholar for papers."""
     try:
-        sch = SemanticScholar()
-        results = sch.search_paper(query, limit=max_results)
-        return [
-            {
-                "title": result.title,
-                "authors": [author.name for author in result.authors],
-                "abstract": result.abstract,
-                "year": result.year,
-                "url": result.url,
-                "doi": result.externalIds.get("DOI", "") if result.externalIds else "",
-                "source": "Semantic Scholar",
-            }
-            for result in results
-        ]
+        return asyncio.run(_run_with_client(_s2_async, query, max_results))
     except Exception as e:
         raise RuntimeError(f"Error searching Semantic Scholar: {e}")
 
-@tool("url_processor")
-def url_processor(url: str) -> Dict[str, Union[str, Dict]]:
-    """Process research papers from URLs (PDF or HTML)."""
+@tool("parallel_paper_search")
+@cached(cache_if=lambda result: not result["errors"])
+def parallel_paper_search(query: str, dois: Optional[List[str]] = None, max_results: int = 5,
+                          sort_by: str = "relevance") -> Dict[str, Union[List[Dict], Dict[str, str]]]:
+    """Search arXiv and Semantic Scholar and resolve DOIs concurrently in one call.
+
+    Sources that fail are listed under "errors" alongside the results that succeeded.
+    """
     try:
-        response = requests.get(url, stream=True, headers={'User-Agent': 'Mozilla/5.0'})
-        response.raise_for_status()
-        
-        content_type = response.headers.get('Content-Type', '').lower()
+        return asyncio.run(_fetch_all(query, dois or [], max_results, sort_by))
+    except Exception as e:
+        raise RuntimeError(f"Error running parallel paper search: {e}")
+
+@cached()
+def _fetch_url(url: str) -> Tuple[str, bytes]:
+    """Download a URL, keeping the raw body so re-processing skips the network."""
+    response = _http.get(url)
+    response.raise_for_status()
+    return response.headers.get('Content-Type', '').lower(), response.content
+
+@cached()
+def _process_url(url: str) -> Dict[str, Union[str, Dict]]:
+    content_type, body = _fetch_url(url)
+    
+    if 'application/pdf' in content_type or url.lower().endswith('.pdf'):
+        text = _read_pdf_text(body)
         
-        if 'application/pdf' in content_type or url.lower().endswith('.pdf'):
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
-                for chunk in response.iter_content(chunk_size=8192):
-                    tmp.write(chunk)
-                tmp_path = tmp.name
-            
-            text = pdf_text_extractor(tmp_path)
-            os.unlink(tmp_path)
-            
-            return {
-                "text": text,
-                "metadata": {
-                    "title": Path(url).stem.replace('_', ' '),
-                    "url": url,
-                    "source": "URL (PDF)"
-                }
+        return {
+            "text": text,
+            "metadata": {
+                "title": Path(url).stem.replace('_', ' '),
+                "url": url,
+                "source": "URL (PDF)"
             }
+        }
+    
+    else:
+        tree = HTMLParser(body)
+        for element in tree.css("script, style"):
+            element.decompose()
         
-        else:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            for element in soup(["script", "style"]):
-                element.extract()
-            
-            text = soup.get_text(separator='\n').strip()
-            title = soup.title.string if soup.title else "Unknown Title"
-            
-            meta_tags = {meta['name'].lower(): meta['content'] 
-                        for meta in soup.find_all('meta') 
-                        if meta.get('name') and meta.get('content')}
-            
-            return {
-                "text": text,
-                "metadata": {
-                    "title": title,
-                    "authors": meta_tags.get('author', '').split(', '),
-                    "description": meta_tags.get('description', ''),
-                    "url": url,
-                    "source": "URL (HTML)",
-                }
+        root = tree.body or tree.root
+        text = root.text(separator='\n').strip() if root else ''
+        title_node = tree.css_first('title')
+        title = title_node.text() if title_node else "Unknown Title"
+        
+        meta_tags = {meta.attributes['name'].lower(): meta.attributes['content'] 
+                    for meta in tree.css('meta') 
+                    if meta.attributes.get('name') and meta.attributes.get('content')}
+        
+        return {
+            "text": text,
+            "metadata": {
+                "title": title,
+                "authors": meta_tags.get('author', '').split(', '),
+                "description": meta_tags.get('description', ''),
+                "url": url,
+                "source": "URL (HTML)",
             }
+        }
+
+@tool("url_processor")
+def url_processor(url: str) -> Dict[str, Union[str, Dict]]:
+    """Process research papers from URLs (PDF or HTML)."""
+    try:
+        return _process_url(url)
     except Exception as e:
         raise RuntimeError(f"Error processing URL: {e}")
 
 @tool("doi_resolver")
+@cached()
 def doi_resolver(doi: str) -> Dict[str, Union[str, List]]:
     """Resolve DOI to retrieve paper metadata and URL."""
     try:
-        doi = doi.strip().removeprefix('doi:').removeprefix('https://doi.org/')
-        work = crossref_commons.retrieval.get_publication_as_json(doi)
-        
-        return {
-            "doi": doi,
-            "title": work.get('title', ['Unknown Title'])[0],
-            "authors": [' '.join(filter(None, [a.get('given'), a.get('family')])) 
-                       for a in work.get('author', [])],
-            "abstract": work.get('abstract', ''),
-            "year": work.get('published', {}).get('date-parts', [[None]])[0][0] or '',
-            "journal": work.get('container-title', [''])[0],
-            "publisher": work.get('publisher', ''),
-            "url": f"https://doi.org/{doi}",
-            "source": "DOI",
-        }
+        return asyncio.run(_run_with_client(_doi_async, doi))
     except Exception as e:
         raise RuntimeError(f"Error resolving DOI: {e}")
 
@@ -177,44 +360,276 @@ def citation_generator(paper_metadata: Dict) -> Dict[str, str]:
     
     return {"apa": apa.strip()}
 
+def _chunk_text(text: str, tokenizer) -> List[str]:
+    """Split text into overlapping windows that fit the summarizer's input size."""
+    ids = tokenizer.encode(text, add_special_tokens=False)
+    step = SUMMARY_CHUNK_TOKENS - SUMMARY_CHUNK_OVERLAP
+    return [
+        tokenizer.decode(ids[start:start + SUMMARY_CHUNK_TOKENS], skip_special_tokens=True)
+        for start in range(0, max(len(ids) - SUMMARY_CHUNK_OVERLAP, 1), step)
+    ]
+
+def _summarize_batch(texts: List[str], max_length: int, min_length: int) -> List[str]:
+    """Summarize texts in one batched pipeline call, serving repeats from the disk cache."""
+    tag = cache_tag(SUMMARIZER_ID)
+    keys = [f"summary:{tag}:{max_length}:{min_length}:{hashlib.sha1(text.encode()).hexdigest()}"
+            for text in texts]
+    summaries = [_cache.get(key, default=ENOVAL) for key in keys]
+    misses = [i for i, summary in enumerate(summaries) if summary is ENOVAL]
+    if not misses:
+        return summaries
+
+    # Batch similar lengths together to cut padding, then restore the caller's order
+    order = sorted(misses, key=lambda i: len(texts[i]))
+    with torch.inference_mode():
+        outputs = get_summarizer()(
+            [texts[i] for i in order],
+            batch_size=8,
+            max_length=max_length,
+            min_length=min_length,
+            do_sample=False,
+            truncation=True
+        )
+    for i, output in zip(order, outputs):
+        summaries[i] = output['summary_text']
+        _cache.set(keys[i], summaries[i])
+    return summaries
+
 @tool("text_summarizer")
-def text_summarizer(text: str) -> str:
-    """Summarizes text using Hugging Face's T5 model."""
-    summarizer = pipeline("summarization", model="t5-small")
-    return summarizer(
-        text[:1024],
-        max_length=500,
-        min_length=50,
-        do_sample=False
-    )[0]['summary_text']
+def text_summarizer(texts: List[str]) -> List[str]:
+    """Summarizes a batch of texts using Hugging Face's T5 model."""
+    if not texts:
+        return []
+    tokenizer = get_summarizer().tokenizer
+    pieces = [_chunk_text(text, tokenizer) for text in texts]
+
+    # Map-reduce: summarize every chunk of every long paper in one batch, join each
+    # paper's chunk summaries and repeat until each paper fits in a single window
+    pending = [i for i, chunks in enumerate(pieces) if len(chunks) > 1]
+    while pending:
+        chunk_summaries = iter(_summarize_batch(
+            [chunk for i in pending for chunk in pieces[i]],
+            max_length=CHUNK_SUMMARY_MAX_LENGTH,
+            min_length=CHUNK_SUMMARY_MIN_LENGTH
+        ))
+        for i in pending:
+            joined = ' '.join(next(chunk_summaries) for _ in pieces[i])
+            pieces[i] = _chunk_text(joined, tokenizer)
+        pending = [i for i in pending if len(pieces[i]) > 1]
+
+    return _summarize_batch([chunks[0] for chunks in pieces], max_length=500, min_length=50)
+
+def _encode_cached(texts: List[str]) -> np.ndarray:
+    """Unit-normalised embeddings, only running the model for texts not seen before."""
+    tag = cache_tag(EMBEDDER_ID)
+    keys = [f"embedding:{tag}:{hashlib.sha1(text.encode()).hexdigest()}" for text in texts]
+    embeds = [_cache.get(key, default=ENOVAL) for key in keys]
+    misses = [i for i, embed in enumerate(embeds) if embed is ENOVAL]
+    if misses:
+        # Encode shortest-first to minimise padding
+        order = sorted(misses, key=lambda i: len(texts[i]))
+        with torch.inference_mode():
+            fresh = get_embedder().encode([texts[i] for i in order], batch_size=64, convert_to_numpy=True,
+                                          normalize_embeddings=True, show_progress_bar=False)
+        for i, embed in zip(order, fresh):
+            embeds[i] = embed
+            _cache.set(keys[i], embed)
+    return np.stack(embeds)
+
+@functools.lru_cache(maxsize=128)
+def _topic_matrix(topics: Tuple[str, ...]) -> np.ndarray:
+    """Unit-normalised topic embeddings, transposed for a direct matmul."""
+    return _encode_cached(list(topics)).T
+
+def _group_topics(similarities: np.ndarray, threshold: float = SECONDARY_TOPIC_THRESHOLD):
+    """Primary topic index per text and a mask of topics scoring above ``threshold``."""
+    return similarities.argmax(axis=1), similarities > threshold
+
+def _classification_records(similarities: np.ndarray, topics: List[str]) -> List[Dict]:
+    primary, secondary = _group_topics(similarities)
+    return [
+        {
+            "scores": {topic: float(score) for topic, score in zip(topics, row)},
+            "primary_topic": topics[primary[i]],
+            "secondary_topics": [topics[j] for j in np.flatnonzero(secondary[i]) if j != primary[i]],
+        }
+        for i, row in enumerate(similarities)
+    ]
 
 @tool("topic_classifier")
-def topic_classifier(text: str, topics: List[str]) -> Dict[str, float]:
-    """Classifies text into topics using SentenceTransformer."""
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    text_embed = model.encode(text)
-    topic_embeds = model.encode(topics)
-    similarities = cosine_similarity([text_embed], topic_embeds)[0]
-    return {topic: float(score) for topic, score in zip(topics, similarities)}
+def topic_classifier(texts: List[str], topics: List[str]) -> List[Dict]:
+    """Classifies a batch of texts into topics using SentenceTransformer."""
+    if not texts:
+        return []
+    text_embeds = _encode_cached(texts)
+    # Both sides are unit vectors, so the dot product is the cosine similarity
+    similarities = text_embeds @ _topic_matrix(tuple(topics))
+    return _classification_records(similarities, topics)
+
+def _is_pdf_url(url: Optional[str]) -> bool:
+    """True for direct PDF links, including arXiv's extension-less /pdf/ URLs."""
+    if not url:
+        return False
+    parts = urlsplit(url)
+    path = parts.path.lower()
+    return path.endswith('.pdf') or (parts.hostname or '').endswith('arxiv.org') and path.startswith('/pdf/')
+
+async def _search_stage(client: httpx.AsyncClient, query: str, dois: List[str],
+                        max_results: int, papers: asyncio.Queue):
+    async def emit(fetch):
+        try:
+            result = await fetch
+        except Exception:
+            # One failing source (e.g. a Semantic Scholar 429 or a bad DOI) must not
+            # cancel the others; the pipeline carries on with whatever arrives
+            return
+        for paper in result if isinstance(result, list) else [result]:
+            await papers.put(paper)
+
+    async with asyncio.TaskGroup() as group:
+        group.create_task(emit(_arxiv_async(client, query, max_results)))
+        group.create_task(emit(_s2_async(client, query, max_results)))
+        for doi in dois:
+            group.create_task(emit(_doi_async(client, doi)))
+    await papers.put(None)
+
+async def _extract_stage(papers: asyncio.Queue, extracted: asyncio.Queue):
+    limit = asyncio.Semaphore(PIPELINE_FETCH_CONCURRENCY)
+
+    async def extract(paper):
+        text = paper.get('summary') or paper.get('abstract') or paper.get('title') or ''
+        # Landing pages (Semantic Scholar, doi.org) would swap the abstract for HTML
+        # boilerplate, so full text is only fetched from direct PDF links
+        if _is_pdf_url(paper.get('url')):
+            async with limit:
+                try:
+                    text = (await asyncio.to_thread(_process_url, paper['url']))['text'] or text
+                except Exception:
+                    # Paywalled or unreachable full text: classify on the abstract instead
+                    pass
+        await extracted.put((paper, text))
+
+    async with asyncio.TaskGroup() as group:
+        while (paper := await papers.get()) is not None:
+            group.create_task(extract(paper))
+    await extracted.put(None)
+
+async def _embed_stage(extracted: asyncio.Queue, results: List[Tuple[Dict, str, np.ndarray]]):
+    loop = asyncio.get_running_loop()
+    done = False
+    while not done:
+        # Flush a microbatch once it is full or PIPELINE_FLUSH_SECONDS have passed
+        batch = []
+        deadline = loop.time() + PIPELINE_FLUSH_SECONDS
+        while len(batch) < PIPELINE_EMBED_BATCH:
+            try:
+                item = await asyncio.wait_for(extracted.get(), timeout=max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                done = True
+                break
+            batch.append(item)
+        if batch:
+            embeds = await asyncio.to_thread(_encode_cached, [text for _, text in batch])
+            results.extend((paper, text, embed) for (paper, text), embed in zip(batch, embeds))
+
+async def _run_paper_pipeline(query: str, dois: List[str],
+                              max_results: int) -> List[Tuple[Dict, str, np.ndarray]]:
+    papers, extracted = asyncio.Queue(), asyncio.Queue()
+    results = []
+    async with _async_client() as client, asyncio.TaskGroup() as group:
+        group.create_task(_search_stage(client, query, dois, max_results, papers))
+        group.create_task(_extract_stage(papers, extracted))
+        group.create_task(_embed_stage(extracted, results))
+    return results
+
+@tool("streaming_paper_pipeline")
+def streaming_paper_pipeline(query: str, topics: List[str], dois: Optional[List[str]] = None,
+                             max_results: int = 5) -> List[Dict]:
+    """Search, fetch full text and classify papers in one streamed pass.
+
+    Each paper's full text is fetched and embedded as soon as its search result
+    arrives, so network, PDF parsing and embedding overlap.
+    """
+    try:
+        results = asyncio.run(_run_paper_pipeline(query, dois or [], max_results))
+    except Exception as e:
+        raise RuntimeError(f"Error running paper pipeline: {e}")
+    if not results:
+        return []
+    similarities = np.stack([embed for _, _, embed in results]) @ _topic_matrix(tuple(topics))
+    return [
+        {"metadata": paper, "text": text, "classification": classification}
+        for (paper, text, _), classification in zip(results, _classification_records(similarities, topics))
+    ]
 
 @tool("cross_paper_synthesizer")
-def cross_paper_synthesizer(papers: List[Dict], topic: str) -> str:
-    """Generates synthesis across multiple papers."""
-    synthesizer = pipeline("text2text-generation", model="google/flan-t5-large")
-    context = "\n\n".join(
-        f"Title: {p['title']}\nSummary: {p.get('summary', '')}" 
-        for p in papers
-    )
-    return synthesizer(
-        f"Analyze these papers on {topic}:\n{context}",
-        max_length=500
-    )[0]['generated_text']
+def cross_paper_synthesizer(topic_to_papers: Dict[str, List[Dict]]) -> Dict[str, str]:
+    """Generates a synthesis across multiple papers for each topic."""
+    if not topic_to_papers:
+        return {}
+    synthesizer = get_synthesizer()
+    prompts = [
+        f"Analyze these papers on {topic}:\n" + "\n\n".join(
+            f"Title: {p['title']}\nSummary: {p.get('summary', '')}"
+            for p in papers
+        )
+        for topic, papers in topic_to_papers.items()
+    ]
+    with torch.inference_mode():
+        outputs = synthesizer(prompts, batch_size=4, max_length=500, truncation=True)
+    return {
+        topic: output['generated_text']
+        for topic, output in zip(topic_to_papers, outputs)
+    }
+
+@functools.lru_cache(maxsize=None)
+def _ensure_dir(path: str) -> None:
+    """Create a long-lived directory once per process instead of on every call."""
+    os.makedirs(path, exist_ok=True)
+
+def _audio_path(text: str) -> str:
+    # Name files by content hash so identical text is only synthesized once
+    extension = "wav" if get_voice() else "mp3"
+    filename = f"audio_{hashlib.sha1(text.encode()).hexdigest()[:16]}.{extension}"
+    return os.path.join(AUDIO_DIR, filename)
+
+def _synthesize_audio(text: str, filepath: str) -> None:
+    if os.path.exists(filepath):
+        return
+    # Synthesize into a private temp file and only move it into place once complete,
+    # so a failed or concurrent run never leaves a truncated file at the cached path
+    fd, tmp_path = tempfile.mkstemp(dir=AUDIO_DIR, suffix=Path(filepath).suffix)
+    os.close(fd)
+    try:
+        voice = get_voice()
+        if voice:
+            with wave.open(tmp_path, 'wb') as wav:
+                # Sets channels, sample width and rate from the voice config
+                voice.synthesize_wav(text, wav)
+        else:
+            gTTS(text=text, lang='en').save(tmp_path)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
 
 @tool("audio_generator")
-def audio_generator(text: str) -> str:
-    """Converts text to speech using gTTS."""
-    filename = f"audio_{uuid.uuid4().hex[:8]}.mp3"
-    filepath = os.path.join("audio_files", filename)
-    os.makedirs("audio_files", exist_ok=True)
-    gTTS(text=text[:5000], lang='en').save(filepath)
-    return filepath
+def audio_generator(items: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Converts a batch of {id, text} records to speech, concurrently.
+
+    Uses a local Piper voice when one is installed, otherwise gTTS.
+    """
+    if not items:
+        return []
+    _ensure_dir(AUDIO_DIR)
+    texts = [item['text'][:5000] for item in items]
+    paths = [_audio_path(text) for text in texts]
+    # Synthesize each distinct text once, even when it repeats within the batch
+    unique = dict(zip(paths, texts))
+    # Piper is CPU-bound, so size the pool to the cores; gTTS is network-bound
+    max_workers = (os.cpu_count() or 1) if get_voice() else AUDIO_MAX_WORKERS
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as executor:
+        list(executor.map(_synthesize_audio, unique.values(), unique.keys()))
+    return [{"id": item['id'], "path": path} for item, path in zip(items, paths)]
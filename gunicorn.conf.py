@@ -0,0 +1,15 @@
+import multiprocessing
+import os
+
+# Every worker process loads its own copy of the models (several GB), so keep the
+# process count small; crew.kickoff mostly waits on LLM and network calls, so each
+# worker's threads keep many requests in flight, each on its own copy of the crew
+# but sharing the process's models
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = 8
+timeout = 600
+
+# Split the cores between workers so their torch intra-op pools don't oversubscribe
+os.environ.setdefault("TORCH_NUM_THREADS", str(max(multiprocessing.cpu_count() // workers, 1)))
@@ -1,26 +1,132 @@
 import os
 from dotenv import load_dotenv
 import json
-import uuid
-from flask import Flask, render_template, request, send_from_directory
+import mimetypes
+import hashlib
+import orjson
+import re
+import string
+import threading
+import secrets
+import tempfile
+import zipfile
+from collections import Counter
+from urllib.parse import quote
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from flask import Flask, Response, render_template, request, send_from_directory
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
-from crewai import Crew, Process
-from MultiAgent.agents import CustomAgents
-from MultiAgent.tasks import (  
-    search_task, upload_task, process_task,
-    classification_task, summary_task,
-    synthesis_task, audio_task
-)
+from diskcache import Cache
+import numpy as np
+
+# crewai and MultiAgent pull in torch/transformers, so they are imported only when the
+# summarizer is first built; serving the form page doesn't pay for them
 
 load_dotenv()
 
+# Checked at import so a missing key stops startup; only the crew itself is built lazily
+if not os.getenv("OPENAI_API_KEY"):
+    raise ValueError("OpenAI API key is required. Set via .env or the environment.")
+
+# name -> (MultiAgent.tasks template name, agent key, names of the tasks it depends on),
+# in dependency order
+TASK_GRAPH = {
+    "search": ("search_task", "research", []),
+    "upload": ("upload_task", "processing", []),
+    "process": ("process_task", "processing", ["search", "upload"]),
+    "classification": ("classification_task", "classification", ["process"]),
+    "summary": ("summary_task", "summarization", ["classification"]),
+    "synthesis": ("synthesis_task", "synthesis", ["summary"]),
+    "audio": ("audio_task", "audio", ["synthesis"]),
+}
+
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024
+# Offload downloads to the front-end server: X-Sendfile (Apache/lighttpd) or an nginx
+# internal location aliased to results/ (e.g. X_ACCEL_REDIRECT_PREFIX=/protected_results)
+app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE') == '1'
+app.config['X_ACCEL_REDIRECT_PREFIX'] = os.getenv('X_ACCEL_REDIRECT_PREFIX', '')
+UPLOAD_WORKERS = 8
+# Commas plus any whitespace around them; whitespace inside an item (e.g. "AI Safety") is kept
+_LIST_SEPARATOR = re.compile(r'\s*,\s*')
+UPLOAD_BUFFER_SIZE = 1 << 20
+SAVE_WORKERS = 16
+# 'zip' stores summaries/syntheses in one archive per session; 'files' keeps loose .md files
+RESULTS_LAYOUT = os.getenv('RESULTS_LAYOUT', 'zip')
+RESULTS_ARCHIVE = 'results.zip'
+# Single-pass lower-casing and space -> underscore for ASCII topic filenames
+_TOPIC_FILENAME_TABLE = str.maketrans({' ': '_', **{c: c.lower() for c in string.ascii_uppercase}})
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs('audio_files', exist_ok=True)
 os.makedirs('results', exist_ok=True)
 
+# Exact-match cache of crew outputs, so identical requests skip the LLM run
+RESULT_CACHE_TTL = 24 * 60 * 60
+result_cache = Cache('.result_cache')
+# Cosine similarity above which a previous query's results are reused for a paraphrase
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+# Most recent queries kept in each topic set's semantic index, which is loaded on every lookup
+SEMANTIC_INDEX_MAX = 1024
+
+def _map_tasks(agents):
+    """Dynamically map agents to imported tasks.
+
+    Tasks are grouped into dependency levels from TASK_GRAPH (which lists every
+    task after its dependencies); when a level holds several independent tasks
+    they run with async_execution so the next level's context waits on all of
+    them together.
+    """
+    levels = {}
+    for name, (_, _, deps) in TASK_GRAPH.items():
+        levels[name] = 1 + max((levels[dep] for dep in deps), default=-1)
+    level_sizes = Counter(levels.values())
+
+    from MultiAgent import tasks
+
+    created = {}
+    for name in sorted(TASK_GRAPH, key=levels.get):
+        template_name, agent_name, deps = TASK_GRAPH[name]
+        created[name] = _create_task(
+            getattr(tasks, template_name), agents[agent_name],
+            context=[created[dep] for dep in deps],
+            async_execution=level_sizes[levels[name]] > 1
+        )
+    return list(created.values())
+
+def _create_task(base_task, agent, context=None, async_execution=False):
+    return type(base_task)(
+        description=base_task.description,
+        agent=agent,
+        expected_output=base_task.expected_output,
+        tools=list(base_task.tools or []),
+        context=context or [],
+        async_execution=async_execution,
+        allow_delegation=getattr(base_task, 'allow_delegation', False),
+        verbose=getattr(base_task, 'verbose', False)
+    )
+
+@lru_cache(maxsize=1)
+def build_agents():
+    """Construct the crew's agents once per process."""
+    from MultiAgent.agents import CustomAgents
+
+    agents = CustomAgents()
+    return {
+        "research": agents.research_agent(),
+        "processing": agents.processing_agent(),
+        "classification": agents.classification_agent(),
+        "summarization": agents.summarization_agent(),
+        "synthesis": agents.synthesis_agent(),
+        "audio": agents.audio_agent()
+    }
+
+@lru_cache(maxsize=1)
+def build_tasks():
+    """Map the task templates onto the shared agents once per process."""
+    return tuple(_map_tasks(build_agents()))
+
 class ResearchPaperSummarizer:
     def __init__(self, api_key=None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
@@ -29,18 +135,12 @@ class ResearchPaperSummarizer:
             
         os.environ["OPENAI_API_KEY"] = self.api_key 
 
-    def __init__(self):
-        self.agents = CustomAgents()
-        agent_instances = {
-            "research": self.agents.research_agent(),
-            "processing": self.agents.processing_agent(),
-            "classification": self.agents.classification_agent(),
-            "summarization": self.agents.summarization_agent(),
-            "synthesis": self.agents.synthesis_agent(),
-            "audio": self.agents.audio_agent()
-        }
-        
-        self.tasks = self._map_tasks(agent_instances)
+        from crewai import Crew, Process
+
+        agent_instances = build_agents()
+        self.tasks = list(build_tasks())
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
         
         self.crew = Crew(
             agents=list(agent_instances.values()),
@@ -50,51 +150,23 @@ class ResearchPaperSummarizer:
             verbose=True
         )
 
-    def _map_tasks(self, agents):
-        """Dynamically map agents to imported tasks"""
-        return [
-            self._create_task(search_task, agents["research"]),
-            self._create_task(upload_task, agents["processing"]),
-            self._create_task(process_task, agents["processing"], 
-                            context=[search_task, upload_task]),
-            self._create_task(classification_task, agents["classification"], 
-                            context=[process_task]),
-            self._create_task(summary_task, agents["summarization"], 
-                            context=[classification_task]),
-            self._create_task(synthesis_task, agents["synthesis"], 
-                            context=[summary_task]),
-            self._create_task(audio_task, agents["audio"], 
-                            context=[synthesis_task])
-        ]
-
-    def _create_task(self, base_task, agent, context=None):
-        return type(base_task)(
-            description=base_task.description,
-            agent=agent,
-            expected_output=base_task.expected_output,
-            tools=base_task.tools.copy() if hasattr(base_task, 'tools') else [],
-            context=context or [],
-            allow_delegation=getattr(base_task, 'allow_delegation', False),
-            verbose=getattr(base_task, 'verbose', False)
-        )
-
-    def process_query(self, query, topics, pdf_paths, urls, dois,max_results=5):
-        session_id = str(uuid.uuid4())[:8]
-        result_dir = os.path.join("results", session_id)
-        os.makedirs(result_dir, exist_ok=True)
-
+    def process_query(self, query, topics, pdf_paths, urls, dois,max_results=5, pdf_hashes=None):
         inputs = {
             'query': query,
             'topics': topics,
             'max_results': max_results,
             'pdf_paths': pdf_paths,
             'urls': urls,
-            'dois': dois,
-            'session_id': session_id
+            'dois': dois
         }
 
-        results = self.crew.kickoff(inputs=inputs)
-        self._save_results(results, result_dir)
+        cache_key = self._cache_key(inputs, pdf_hashes or [_file_hash(path) for path in pdf_paths])
+        cached = result_cache.get(cache_key)
+        if cached is None:
+            # Personalised requests (uploads, URLs, DOIs) only ever hit the exact cache
+            personalised = bool(pdf_paths or urls or dois)
+            cached = self._run_deduplicated(cache_key, inputs, personalised)
+        session_id, results = self._ensure_saved(*cached)
         
         return {
             'session_id': session_id,
@@ -106,54 +178,244 @@ class ResearchPaperSummarizer:
             }
         }
 
+    def _ensure_saved(self, session_id, results):
+        """Reuse the session that produced cached results, re-saving only if it was removed."""
+        if os.path.exists(os.path.join("results", session_id, "results.json")):
+            return session_id, results
+        session_id = _new_session_id()
+        self._save_session(session_id, results)
+        return session_id, results
+
+    def _save_session(self, session_id, results):
+        result_dir = os.path.join("results", session_id)
+        _mkdir(result_dir)
+        self._save_results(results, result_dir)
+
+    def _run_deduplicated(self, cache_key, inputs, personalised):
+        """Run the crew once per cache key, even when identical requests arrive together.
+
+        The first caller for a key does the work; concurrent callers with the same
+        key wait on its Future instead of starting their own kickoff. This only saves
+        duplicate work: requests with different keys are kept apart by giving each
+        kickoff its own crew copy in _run_uncached.
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(cache_key)
+            owner = future is None
+            if owner:
+                future = self._inflight[cache_key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            # A previous owner may have stored the result between our cache miss
+            # and taking ownership; only kick off the crew if it's still missing
+            cached = result_cache.get(cache_key)
+            if cached is None:
+                cached = self._run_uncached(cache_key, inputs, personalised)
+            future.set_result(cached)
+            return cached
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[cache_key]
+
+    def _run_uncached(self, cache_key, inputs, personalised):
+        """Return (session_id, results), from the semantic cache or a fresh crew run."""
+        # Paraphrases only match within the exact same topic set; the outputs are per topic
+        topics = tuple(sorted(inputs['topics']))
+        query_vector = None if personalised else self._query_vector(inputs['query'])
+        if query_vector is not None:
+            cached = self._semantic_lookup(topics, query_vector)
+            if cached is not None:
+                # Store the hit under this request's own key so a repeat skips the scan
+                result_cache.set(cache_key, cached, expire=RESULT_CACHE_TTL)
+                return cached
+
+        session_id = _new_session_id()
+        # kickoff rewrites task descriptions and stores task outputs in place, so each
+        # request runs on its own copy of the crew's agents and tasks
+        results = self.crew.copy().kickoff(inputs={**inputs, 'session_id': session_id})
+        self._save_session(session_id, results)
+
+        cached = (session_id, results)
+        result_cache.set(cache_key, cached, expire=RESULT_CACHE_TTL)
+        if query_vector is not None:
+            self._semantic_add(topics, query_vector, cache_key)
+        return cached
+
+    def _query_vector(self, query):
+        from MultiAgent._models import get_embedder
+
+        return get_embedder().encode(query, normalize_embeddings=True, show_progress_bar=False)
+
+    def _semantic_lookup(self, topics, query_vector):
+        """Return cached (session_id, results) for a previous query with the same topics
+        whose embedding is close enough."""
+        keys, vectors = result_cache.get(_semantic_index_key(topics), ([], None))
+        if not keys:
+            return None
+        scores = vectors @ query_vector
+        # Index entries can outlive their results, so fall through to the next-best live match
+        for i in np.argsort(-scores):
+            if scores[i] < SEMANTIC_CACHE_THRESHOLD:
+                break
+            cached = result_cache.get(keys[i])
+            if cached is not None:
+                return cached
+        return None
+
+    def _semantic_add(self, topics, query_vector, cache_key):
+        # transact() locks the cache database, so concurrent gunicorn workers can't
+        # overwrite each other's additions
+        index_key = _semantic_index_key(topics)
+        with result_cache.transact():
+            keys, vectors = result_cache.get(index_key, ([], None))
+            # Drop entries whose results expired and keep only the newest ones
+            live = [i for i, key in enumerate(keys) if key != cache_key and key in result_cache]
+            live = live[-(SEMANTIC_INDEX_MAX - 1):]
+            keys = [keys[i] for i in live] + [cache_key]
+            vectors = np.vstack([vectors[live], query_vector]) if live else query_vector[None]
+            # Every entry's result expires within a TTL, so an idle index can go too
+            result_cache.set(index_key, (keys, vectors), expire=RESULT_CACHE_TTL)
+
+    def _cache_key(self, inputs, pdf_hashes):
+        """Hash everything that determines the crew output, including uploaded PDF content."""
+        key_inputs = dict(inputs)
+        key_inputs['model'] = os.getenv("OPENAI_MODEL_NAME", "")
+        digest = hashlib.sha256(json.dumps(key_inputs, sort_keys=True).encode())
+        for pdf_hash in pdf_hashes:
+            digest.update(b'|' + pdf_hash.encode())
+        return digest.hexdigest()
+
     def _save_results(self, results, result_dir):
-        with open(os.path.join(result_dir, "results.json"), 'w') as f:
-            json.dump(results, f, indent=2)
+        with open(os.path.join(result_dir, "results.json"), 'wb') as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         
         # Save individual files
+        entries = []
         if 'summaries' in results:
-            summary_dir = os.path.join(result_dir, 'summaries')
-            os.makedirs(summary_dir, exist_ok=True)
             for paper_id, summary in results['summaries'].items():
-                with open(os.path.join(summary_dir, f'{paper_id}.md'), 'w') as f:
-                    f.write(summary)
+                entries.append(('summaries', f'{paper_id}.md', summary))
         
         if 'syntheses' in results:
-            synthesis_dir = os.path.join(result_dir, 'syntheses')
-            os.makedirs(synthesis_dir, exist_ok=True)
             for topic, synthesis in results['syntheses'].items():
-                filename = topic.lower().replace(' ', '_') + '.md'
-                with open(os.path.join(synthesis_dir, filename), 'w') as f:
-                    f.write(synthesis)
+                filename = _topic_filename(topic)
+                entries.append(('syntheses', filename, synthesis))
+        
+        if RESULTS_LAYOUT == 'zip':
+            # One archive instead of an inode and file handle per markdown file
+            archive = os.path.join(result_dir, RESULTS_ARCHIVE)
+            with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+                for file_type, filename, text in entries:
+                    zf.writestr(f'{file_type}/{filename}', text)
+            return
+        
+        # Loose files; directories are created up front so the writes can fan out
+        for file_type in {file_type for file_type, _, _ in entries}:
+            _mkdir(os.path.join(result_dir, file_type))
+        writes = [(os.path.join(result_dir, file_type, filename), text)
+                  for file_type, filename, text in entries]
+        with ThreadPoolExecutor(max_workers=SAVE_WORKERS) as executor:
+            list(executor.map(_write_text, writes))
+
+def _semantic_index_key(topics):
+    """Result-cache key of the semantic index for one sorted topic tuple."""
+    return ('semantic_index',) + topics
+
+def _new_session_id():
+    # 4 random bytes -> 8 hex characters
+    return secrets.token_hex(4)
+
+def _topic_filename(topic):
+    """Lower-case the topic and replace spaces with underscores, as the results template does."""
+    if topic.isascii():
+        return topic.translate(_TOPIC_FILENAME_TABLE) + '.md'
+    # str.lower also folds non-ASCII capitals, which the ASCII table can't
+    return topic.lower().replace(' ', '_') + '.md'
+
+def _split_list(value):
+    """Split a comma-separated form field, dropping surrounding whitespace and empty items."""
+    return list(filter(None, _LIST_SEPARATOR.split(value.strip())))
+
+def _mkdir(path):
+    """Create a directory whose parent already exists with a single mkdir syscall."""
+    try:
+        os.mkdir(path)
+    except FileExistsError:
+        pass
 
-#### Initialize the summarizer system
-summarizer = ResearchPaperSummarizer()
+def _write_text(item):
+    path, text = item
+    with open(path, 'w') as f:
+        f.write(text)
+
+def _file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_BUFFER_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _save_upload(file):
+    """Save an upload and return its path with a content hash computed on the way to disk.
+
+    The file is written under a private temp name and then renamed to one prefixed
+    with its digest, so uploads sharing a filename never write the same path at once.
+    """
+    filename = secure_filename(file.filename) or 'upload.pdf'
+    digest = hashlib.blake2b(digest_size=16)
+    fd, tmp_path = tempfile.mkstemp(dir=app.config['UPLOAD_FOLDER'], suffix='.part')
+    try:
+        # Copy in 1 MiB blocks; FileStorage.save defaults to 16 KiB per read/write
+        with open(fd, 'wb', buffering=0) as dst:
+            for chunk in iter(lambda: file.stream.read(UPLOAD_BUFFER_SIZE), b''):
+                digest.update(chunk)
+                dst.write(chunk)
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{digest.hexdigest()}_{filename}')
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return file_path, digest.hexdigest()
+
+#### The crew-backed summarizer is initialized on the first query
+_summarizer = None
+_summarizer_lock = threading.Lock()
+
+def get_research_summarizer():
+    global _summarizer
+    if _summarizer is None:
+        with _summarizer_lock:
+            if _summarizer is None:
+                _summarizer = ResearchPaperSummarizer()
+    return _summarizer
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
         # Handle form submission
         query = request.form.get('query', '')
-        topics = [t.strip() for t in request.form.get('topics', '').split(',') if t.strip()]
-        urls = [u.strip() for u in request.form.get('urls', '').split(',') if u.strip()]
-        dois = [d.strip() for d in request.form.get('dois', '').split(',') if d.strip()]
+        topics = _split_list(request.form.get('topics', ''))
+        urls = _split_list(request.form.get('urls', ''))
+        dois = _split_list(request.form.get('dois', ''))
         
-        # Handle file uploads
-        pdf_paths = []
-        for file in request.files.getlist('pdf_files'):
-            if file.filename != '':
-                filename = secure_filename(file.filename)
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(file_path)
-                pdf_paths.append(file_path)
+        # Handle file uploads, saving them concurrently
+        files = [file for file in request.files.getlist('pdf_files') if file.filename != '']
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+            saved = list(executor.map(_save_upload, files))
+        pdf_paths = [path for path, _ in saved]
         
         # Process the query
-        result = summarizer.process_query(
+        result = get_research_summarizer().process_query(
             query=query,
             topics=topics,
             pdf_paths=pdf_paths,
             urls=urls,
-            dois=dois
+            dois=dois,
+            pdf_hashes=[digest for _, digest in saved]
         )
         
         return render_template('results.html', result=result)
@@ -175,8 +437,28 @@ def download_file(session_id, file_type, filename):
     if file_type not in valid_types:
         return "Invalid file type", 400
     
+    archive = safe_join('results', session_id, RESULTS_ARCHIVE)
+    if file_type != 'audio' and archive and os.path.isfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            try:
+                data = zf.read(f'{file_type}/{filename}')
+            except KeyError:
+                return "File not found", 404
+        return Response(data, mimetype='text/markdown')
+    
     directory = os.path.join('results', session_id, file_type)
+    accel_prefix = app.config['X_ACCEL_REDIRECT_PREFIX']
+    if accel_prefix:
+        # Hand the transfer to nginx; the worker returns immediately with an empty body
+        relative = safe_join(session_id, file_type, filename)
+        if relative is None or not os.path.isfile(os.path.join('results', relative)):
+            return "File not found", 404
+        response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        # Percent-encode so '?', '#', '%' or non-Latin-1 topic names survive the header
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{quote(relative)}"
+        return response
     return send_from_directory(directory, filename)
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    # Development server only; in production run `gunicorn main:app` (see gunicorn.conf.py)
+    app.run(debug=os.getenv('FLASK_DEBUG') == '1', threaded=True)